@@ -1,11 +1,13 @@
+import atexit
+import queue
 import threading
-import time
 from functools import wraps
 from multiprocessing.shared_memory import ShareableList
 from typing import List, Tuple
 
+import numpy as np
 import ray
-from torch.multiprocessing import Lock, SimpleQueue
+from torch.multiprocessing import Lock, RawArray, RawValue, Semaphore, SimpleQueue
 from torch.utils.tensorboard import SummaryWriter
 
 from syllabus.core import Curriculum, decorate_all_functions
@@ -75,16 +77,75 @@ class CurriculumWrapper:
         return self.curriculum.normalize(rewards, task)
 
 
+class TaskRing:
+    """
+    Fixed-size ring buffer of integer task encodings in shared memory.
+
+    Tasks are written as raw int64 values, so passing a task between processes does not require pickling.
+    Pushes block while the ring is full and pops block while it is empty.
+
+    Each side has its own lock, so readers never contend with the writer. The push lock is held for a whole burst,
+    including any wait for free slots, so a burst is written contiguously. The pop lock only guards the tail update.
+    Python exposes no atomic compare-and-swap on shared memory, so a lock-free ring would need a compiled extension.
+    """
+    def __init__(self, capacity: int = 4096):
+        assert capacity > 0, f"Ring capacity must be positive. Got {capacity} instead."
+        self.capacity = capacity
+        self._buffer = RawArray("q", capacity)
+        self._head = RawValue("Q", 0)
+        self._tail = RawValue("Q", 0)
+        self._items = Semaphore(0)
+        self._slots = Semaphore(capacity)
+        self._push_lock = Lock()
+        self._pop_lock = Lock()
+
+    def push(self, value: int):
+        self.push_many([value])
+
+    def push_many(self, values: List[int]):
+        with self._push_lock:
+            for value in values:
+                self._slots.acquire()   # Blocks until a slot is free
+                self._buffer[self._head.value % self.capacity] = value
+                self._head.value += 1
+                self._items.release()
+
+    def pop(self) -> int:
+        self._items.acquire()   # Blocks until a task is available
+        with self._pop_lock:
+            value = self._buffer[self._tail.value % self.capacity]
+            self._tail.value += 1
+        self._slots.release()
+        return value
+
+    def __len__(self):
+        return self._head.value - self._tail.value
+
+
 class MultiProcessingComponents:
-    def __init__(self, task_queue, update_queue):
+    # Ring value telling the reader that the next task was sent through the task queue instead
+    QUEUED_TASK = -1
+
+    def __init__(self, task_queue, update_queue, task_ring_size: int = 4096):
         self.task_queue = task_queue
         self.update_queue = update_queue
+        self.task_ring = TaskRing(task_ring_size)
         self._instance_lock = Lock()
         self._env_count = ShareableList([0])
         self._task_count = ShareableList([0])
         self._update_count = ShareableList([0])
         self._debug = False
         self._verbose = False
+        self._closed = False
+
+    def close(self):
+        """Close and unlink the shared memory counters. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        for shared_list in (self._env_count, self._update_count, self._task_count):
+            shared_list.shm.close()
+            shared_list.shm.unlink()
 
     def get_id(self):
         with self._instance_lock:
@@ -93,19 +154,57 @@ class MultiProcessingComponents:
         return instance_id
 
     def put_task(self, task):
-        self.task_queue.put(task)
+        self.put_tasks([task])
+
+    def put_tasks(self, tasks):
+        """
+        Put a burst of task messages on the task ring.
+
+        Each message is sent through the task queue, and a QUEUED_TASK marker in the ring tells the reader
+        to fetch it from there. Use put_task_encodings for sampled tasks, which can skip the queue.
+        """
+        for task in tasks:
+            self.task_queue.put(task)
+        # Queued messages must be sent before their markers are visible to readers
+        self.task_ring.push_many([self.QUEUED_TASK] * len(tasks))
+        self._count_added_tasks(len(tasks))
+
+    def put_task_encodings(self, encodings):
+        """
+        Put a burst of sampled task encodings on the task ring.
+
+        Non-negative integer encodings are written to the shared memory ring directly, so they are never pickled.
+        Any other encoding is wrapped in a message and sent through the task queue behind a QUEUED_TASK marker.
+        Each task is still sent separately so that any environment can receive it.
+        """
+        ring_values = []
+        for encoding in encodings:
+            if isinstance(encoding, (int, np.integer)) and encoding >= 0:
+                ring_values.append(int(encoding))
+            else:
+                self.task_queue.put({"next_task": encoding})
+                ring_values.append(self.QUEUED_TASK)
+        self.task_ring.push_many(ring_values)
+        self._count_added_tasks(len(ring_values))
+
+    def _count_added_tasks(self, count):
         if self._debug:
-            task_count = self.added_task()
+            task_count = self.added_task(count)
             if self._verbose:
-                print(f"Task added to queue. Task count: {task_count}")
+                print(f"{count} tasks added to queue. Task count: {task_count}")
 
     def get_task(self):
-        task = self.task_queue.get()
+        task = self.task_ring.pop()     # Blocks until a task is available
+        if task == self.QUEUED_TASK:
+            message = self.task_queue.get()
+        else:
+            message = {"next_task": task}
+
         if self._debug:
             task_count = self.removed_task()
             if self._verbose:
                 print(f"Task removed from queue. Task count: {task_count}")
-        return task
+        return message
 
     def put_update(self, update):
         self.update_queue.put(update)
@@ -123,9 +222,33 @@ class MultiProcessingComponents:
 
         return update
 
-    def added_task(self):
+    def get_updates(self):
+        """
+        Block until an update is available, then drain every other update already in the queue.
+
+        Batched updates from the environments are flattened into a single list of update dictionaries.
+        Shutdown sentinels (None) are kept in the list as-is.
+        """
+        messages = [self.update_queue.get()]
+        while not self.update_queue.empty():
+            messages.append(self.update_queue.get())
+
+        if self._debug:
+            update_count = self.removed_update(len(messages))
+            if self._verbose:
+                print(f"{len(messages)} updates removed from queue. Update count: {update_count}")
+
+        updates = []
+        for message in messages:
+            if message is None or isinstance(message, dict):
+                updates.append(message)
+            else:
+                updates.extend(message)
+        return updates
+
+    def added_task(self, count=1):
         with self._instance_lock:
-            self._task_count[0] += 1
+            self._task_count[0] += count
             task_count = self._task_count[0]
         return task_count
 
@@ -151,9 +274,9 @@ class MultiProcessingComponents:
             update_count = self._update_count[0]
         return update_count
 
-    def removed_update(self):
+    def removed_update(self, count=1):
         with self._instance_lock:
-            self._update_count[0] -= 1
+            self._update_count[0] -= count
             update_count = self._update_count[0]
         return update_count
 
@@ -172,79 +295,128 @@ class MultiProcessingCurriculumWrapper(CurriculumWrapper):
         self.sequential_start = sequential_start
 
         self.update_thread = None
+        self.sample_thread = None
         self.should_update = False
         self.added_tasks = []
         self.num_assigned_tasks = 0
 
         self._components = MultiProcessingComponents(task_queue, update_queue)
+        # Number of requested tasks passed from the update thread to the sample thread. None stops the sample thread.
+        self._sample_requests = queue.Queue()
+        # Curricula are not thread-safe, so updates and sampling never run at the same time
+        self._curriculum_lock = threading.Lock()
 
     def start(self):
         """
-        Start the thread that reads the complete_queue and reads the task_queue.
+        Start the threads that read the update_queue and fill the task_queue.
         """
         self.update_thread = threading.Thread(name='update', target=self._update_queues, daemon=True)
+        self.sample_thread = threading.Thread(name='sample', target=self._sample_tasks, daemon=True)
         self.should_update = True
         self.update_thread.start()
+        self.sample_thread.start()
+        # Stop the threads and release shared memory if the wrapper is never closed explicitly
+        atexit.register(self._shutdown)
 
-    def stop(self):
-        """
-        Stop the thread that reads the complete_queue and reads the task_queue.
+    def stop(self, timeout: float = None):
         """
-        # Process final few updates
-        start = time.time()
-        end = time.time()
-        while end - start < 3 and not self.update_queue.empty():
-            time.sleep(0.5)
-            end = time.time()
+        Stop the threads that read the update_queue and fill the task_queue, then release shared memory.
+        Shared memory is kept if a thread is still running after the timeout, and released by a later call.
 
-        self.should_update = False
-        self.update_thread.join()
-        components = self.get_components()
-        components._env_count.shm.close()
-        components._env_count.shm.unlink()
-        components._update_count.shm.close()
-        components._update_count.shm.unlink()
-        components._task_count.shm.close()
-        components._task_count.shm.unlink()
+        :param timeout: Maximum number of seconds to wait for each thread to finish, defaults to waiting indefinitely
+        """
+        if self.should_update:
+            atexit.unregister(self._shutdown)
+
+            # Updates are processed in order, so every update queued before the sentinel is applied before the threads exit
+            self.get_components().put_update(None)
+            self.update_thread.join(timeout=timeout)
+            if self.update_thread.is_alive():
+                # The update thread did not reach the sentinel in time, so release the sample thread directly
+                self._sample_requests.put(None)
+            self.sample_thread.join(timeout=timeout)
+            self.should_update = False
+
+        # A thread that missed the timeout may still update the shared counters
+        if any(thread is not None and thread.is_alive() for thread in (self.update_thread, self.sample_thread)):
+            return
+        self.get_components().close()
         # components.task_queue.close()
         # components.update_queue.close()
 
-    def _update_queues(self):
+    def close(self):
         """
-        Continuously process completed tasks and sample new tasks.
+        Stop the curriculum threads and release shared memory.
         """
-        # TODO: Refactor long method? Write tests first
-        # Update curriculum with environment results:
-        while self.should_update:
-            requested_tasks = 0
-            while not self.update_queue.empty():
+        self.stop()
 
-                batch_updates = self.get_components().get_update()  # Blocks until update is available
+    def _shutdown(self):
+        # Called at interpreter exit. Bound the wait so that a stuck thread cannot hang shutdown.
+        self.stop(timeout=1.0)
 
-                if isinstance(batch_updates, dict):
-                    batch_updates = [batch_updates]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _update_queues(self):
+        """
+        Continuously process completed tasks and pass sample requests to the sample thread.
+
+        Blocks on the update queue instead of polling it, so the thread only wakes when an
+        environment posts an update. Any other updates already in the queue are processed in the same batch.
+        A None update is the shutdown sentinel sent by stop(), and is forwarded to the sample thread.
+        """
+        components = self.get_components()
+        should_stop = False
+        try:
+            while not should_stop:
+                batch_updates = components.get_updates()    # Blocks until an update is available
+                if None in batch_updates:
+                    should_stop = True
+                    batch_updates = [update for update in batch_updates if update is not None]
 
                 # Count number of requested tasks
-                for update in batch_updates:
-                    if "request_sample" in update and update["request_sample"]:
-                        requested_tasks += 1
+                requested_tasks = sum(1 for update in batch_updates if update.get("request_sample"))
 
-                self.update_batch(batch_updates)
+                if batch_updates:
+                    with self._curriculum_lock:
+                        self.update_batch(batch_updates)
 
-            # Sample new tasks
+                # Requests are only passed on after the updates that made them, so samples reflect those updates
+                if requested_tasks > 0:
+                    self._sample_requests.put(requested_tasks)
+        finally:
+            # Always release the sample thread, even if a curriculum update raised
+            self._sample_requests.put(None)
+
+    def _sample_tasks(self):
+        """
+        Sample requested tasks and send them to the environments.
+
+        Runs on its own thread so that a slow curriculum sample does not delay reading updates from the environments.
+        All requests that are waiting when the thread wakes up are sampled together.
+        """
+        components = self.get_components()
+        should_stop = False
+        while not should_stop:
+            requests = [self._sample_requests.get()]    # Blocks until tasks are requested
+            while True:
+                try:
+                    requests.append(self._sample_requests.get_nowait())
+                except queue.Empty:
+                    break
+            if None in requests:
+                should_stop = True
+                requests = [request for request in requests if request is not None]
+
+            requested_tasks = sum(requests)
             if requested_tasks > 0:
-                new_tasks = self.curriculum.sample(k=requested_tasks)
-                for i, task in enumerate(new_tasks):
-                    message = {
-                        "next_task": task,
-                        "sample_id": self.num_assigned_tasks + i,
-                    }
-
-                    self.get_components().put_task(message)
+                with self._curriculum_lock:
+                    new_tasks = self.curriculum.sample(k=requested_tasks)
+                components.put_task_encodings(new_tasks)
                 self.num_assigned_tasks += requested_tasks
-                time.sleep(0)
-            else:
-                time.sleep(0.01)
 
     def log_metrics(self, writer, step=None):
         super().log_metrics(writer, step=step)
@@ -265,18 +437,16 @@ def remote_call(func):
     """
     Decorator for automatically forwarding calls to the curriculum via ray remote calls.
 
+    decorate_all_functions only applies this to functions that the subclass does not override, so the forwarder
+    is specialized to the function name once at class creation instead of checking for overrides on every call.
+
     Note that this causes functions to block, and should be only used for operations that do not require parallelization.
     """
+    f_name = func.__name__
+
     @wraps(func)
     def wrapper(self, *args, **kw):
-        f_name = func.__name__
-        parent_func = getattr(CurriculumWrapper, f_name)
-        child_func = getattr(self, f_name)
-
-        # Only forward call if subclass does not explicitly override the function.
-        if child_func == parent_func:
-            curriculum_func = getattr(self.curriculum, f_name)
-            return ray.get(curriculum_func.remote(*args, **kw))
+        return ray.get(getattr(self.curriculum, f_name).remote(*args, **kw))
     return wrapper
 
 
@@ -311,25 +481,82 @@ class RayCurriculumWrapper(CurriculumWrapper):
     The @decorate_all_functions(remote_call) annotation automatically forwards all functions not explicitly
     overridden here to the remote curriculum. This is intended to forward private functions of Curriculum subclasses
     for convenience.
+
+    By default the curriculum actor processes one call at a time. Setting max_concurrency > 1 lets the actor run
+    calls from different environments in parallel threads, which removes queueing at the actor but requires
+    the curriculum to be thread-safe. Calls may then also run out of submission order.
     # TODO: Implement the Curriculum methods explicitly
     """
-    def __init__(self, curriculum, actor_name="curriculum") -> None:
+    # Number of in-flight update calls allowed before update calls block on the actor
+    MAX_PENDING_UPDATES = 1000
+
+    def __init__(self, curriculum, actor_name="curriculum", max_concurrency: int = 1) -> None:
         super().__init__(curriculum)
-        self.curriculum = RayWrapper.options(name=actor_name).remote(curriculum)
+        assert max_concurrency > 0, f"max_concurrency must be positive. Got {max_concurrency} instead."
+        self.curriculum = RayWrapper.options(name=actor_name, max_concurrency=max_concurrency).remote(curriculum)
         self.unwrapped = None
         self.task_space = curriculum.task_space
         self.added_tasks = []
+        self._pending_updates = []
 
     # If you choose to override a function, you will need to forward the call to the remote curriculum.
     # This method is shown here as an example. If you remove it, the same functionality will be provided automatically.
     def sample(self, k: int = 1):
+        """Blocking sample. Prefer sample_async to overlap sampling with other work."""
+        self.flush()
         return ray.get(self.curriculum.sample.remote(k=k))
 
+    def sample_async(self, k: int = 1) -> ray.ObjectRef:
+        """Sample k tasks without waiting for the result. Resolve the returned reference with ray.get or ray.wait."""
+        return self.curriculum.sample.remote(k=k)
+
+    # Updates do not return anything, so they are sent without waiting for the actor to process them.
+    # Calls from this wrapper run on the actor in submission order, so later calls still observe earlier updates.
+    def update_task_progress(self, task, progress):
+        self._track_update(self.curriculum.update_task_progress.remote(task, progress))
+
+    def update_on_step(self, task, step, reward, term, trunc):
+        self._track_update(self.curriculum.update_on_step.remote(task, step, reward, term, trunc))
+
     def update_on_step_batch(self, step_results: List[Tuple[int, int, int, int]]) -> None:
-        ray.get(self.curriculum._on_step_batch.remote(step_results))
+        self._track_update(self.curriculum.update_on_step_batch.remote(step_results))
+
+    def update_on_episode(self, episode_return, episode_length, episode_task, env_id=None):
+        self._track_update(self.curriculum.update_on_episode.remote(episode_return, episode_length, episode_task, env_id=env_id))
+
+    def update(self, metrics):
+        self._track_update(self.curriculum.update.remote(metrics))
+
+    def update_batch(self, metrics):
+        self._track_update(self.curriculum.update_batch.remote(metrics))
+
+    def _track_update(self, ref: ray.ObjectRef):
+        self._pending_updates.append(ref)
+        if len(self._pending_updates) >= self.MAX_PENDING_UPDATES:
+            # Block until the backlog is back under half the limit, raising any errors from the actor
+            num_returns = len(self._pending_updates) - self.MAX_PENDING_UPDATES // 2
+            ready, self._pending_updates = ray.wait(self._pending_updates, num_returns=num_returns)
+            ray.get(ready)
+
+    def flush(self):
+        """Wait for all in-flight updates to finish on the actor, raising any errors they produced."""
+        pending, self._pending_updates = self._pending_updates, []
+        ray.get(pending)
+
+    # The task space is mirrored locally by add_task, so task queries are answered without a round trip to the actor.
+    # Tasks added directly on the actor (e.g. through RaySyncWrapper.add_task) are not reflected here.
+    def count_tasks(self, task_space=None):
+        return self.task_space.count_tasks(gym_space=task_space)
+
+    def get_tasks(self, task_space=None):
+        return self.task_space.get_tasks(gym_space=task_space)
 
     def add_task(self, task):
-        super().add_task(task)
+        # Wait for the actor so that errors from curricula without add_task support surface here,
+        # then mirror the change in the local task space. Tasks are only pickled once, in this call.
+        self.flush()
+        ray.get(self.curriculum.add_task.remote(task))
+        self.task_space.add_task(task)
         self.added_tasks.append(task)
 
 
@@ -153,7 +153,7 @@ class SequentialCurriculum(Curriculum):
         tasks = curriculum.sample(k)
 
         # Recode tasks into environment task space
-        decoded_tasks = [curriculum.task_space.decode(task) for task in tasks]
+        decoded_tasks = curriculum.task_space.decode_many(tasks)
         recoded_tasks = [self.task_space.encode(task) for task in decoded_tasks]
 
         self.n_tasks += k
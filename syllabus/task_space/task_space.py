@@ -1,4 +1,6 @@
+import functools
 import itertools
+import operator
 from typing import Any, List, Union
 
 import numpy as np
@@ -26,11 +28,31 @@ class TaskSpace():
         if tasks is None:
             tasks = self._generate_task_names(gym_space)
 
-        self._task_set = set(tasks) if tasks is not None else None
+        self._task_set = frozenset(tasks) if tasks is not None else None
         self._task_list = tasks
         self._encoder, self._decoder = self._make_task_encoder(gym_space, tasks)
+        self._update_task_cache()
         self.task_shape = np.array(self.encode(self.sample())).shape
 
+    def _update_task_cache(self):
+        """Cache the task count and task list. Must be called whenever the gym space or tasks change."""
+        self._space_task_counts = {}
+        self._num_tasks = self._count_tasks(self.gym_space)
+        if isinstance(self.gym_space, MultiDiscrete):
+            self._tasks = list(range(len(self._task_list)))
+        else:
+            self._tasks = self._task_list
+
+        self._is_discrete = isinstance(self.gym_space, Discrete)
+        self._contains = self._make_contains(self.gym_space) if self._is_discrete else None
+
+        # Lookup table for vectorized decoding of Discrete encodings
+        self._decode_array = None
+        if self._is_discrete:
+            self._decode_array = np.empty(len(self._task_list), dtype=object)
+            for i, task in enumerate(self._task_list):
+                self._decode_array[i] = task
+
     def _create_gym_space(self, gym_space):
         if isinstance(gym_space, int):
             # Syntactic sugar for discrete space
@@ -70,12 +92,14 @@ class TaskSpace():
             assert space.n == len(tasks), f"Number of tasks ({space.n}) must match number of discrete options ({len(tasks)})"
             self._encode_map = {task: i for i, task in enumerate(tasks)}
             self._decode_map = {i: task for i, task in enumerate(tasks)}
-            encoder = lambda task: self._encode_map[task] if task in self._encode_map else None
-            decoder = lambda task: self._decode_map[task] if task in self._decode_map else None
+            encode_map, decode_list, contains = self._encode_map, tuple(tasks), self._make_contains(space)
+            encoder = lambda task: encode_map.get(task)
+            decoder = lambda encoding: decode_list[int(encoding)] if contains(encoding) else None
 
         elif isinstance(space, Box):
-            encoder = lambda task: task if space.contains(np.asarray(task, dtype=space.dtype)) else None
-            decoder = lambda task: task if space.contains(np.asarray(task, dtype=space.dtype)) else None
+            contains = self._make_contains(space)
+            encoder = lambda task: task if contains(task) else None
+            decoder = lambda task: task if contains(task) else None
         elif isinstance(space, Tuple):
 
             assert len(space.spaces) == len(tasks), f"Number of task ({len(space.spaces)})must match options in Tuple ({len(tasks)})"
@@ -117,6 +141,23 @@ class TaskSpace():
             decoder = lambda task: task
         return encoder, decoder
 
+    def _make_contains(self, space):
+        """Return a membership check for encodings of the given space, specialized to the space type."""
+        if isinstance(space, Discrete):
+            # Encodings are task indices, so a bounds check replaces gym's contains and its array allocation
+            n = int(space.n)
+
+            def contains(encoding):
+                # Integral floats such as 1.0 are accepted as indices, matching the previous dictionary lookup
+                if isinstance(encoding, (int, np.integer)):
+                    return 0 <= encoding < n
+                return isinstance(encoding, (float, np.floating)) and encoding.is_integer() and 0 <= encoding < n
+            return contains
+        elif isinstance(space, Box):
+            return lambda encoding: space.contains(np.asarray(encoding, dtype=space.dtype))
+        else:
+            return space.contains
+
     def decode(self, encoding):
         """Convert the efficient task encoding to a task that can be used by the environment."""
         return self._decoder(encoding)
@@ -125,14 +166,32 @@ class TaskSpace():
         """Convert the task to an efficient encoding to speed up multiprocessing."""
         return self._encoder(task)
 
+    def decode_many(self, encodings) -> List[Any]:
+        """Decode a batch of task encodings. Discrete encodings are decoded with a single vectorized lookup."""
+        if self._decode_array is None:
+            return [self._decoder(encoding) for encoding in encodings]
+
+        encodings = np.asarray(encodings)
+        if encodings.dtype.kind == "b":
+            # Bools index like 0 and 1 in decode, not as a mask
+            encodings = encodings.astype(np.intp)
+        if encodings.dtype.kind not in "iu":
+            return [self._decoder(encoding) for encoding in encodings.tolist()]
+        valid = (encodings >= 0) & (encodings < len(self._decode_array))
+        tasks = np.full(encodings.shape, None, dtype=object)
+        tasks[valid] = self._decode_array[encodings[valid]]
+        return tasks.tolist()
+
     def add_task(self, task):
         """Add a task to the task space. Only implemented for discrete spaces."""
         if task not in self._task_set:
-            self._task_set.add(task)
+            self._task_set = self._task_set | {task}
+            self._task_list = list(self._task_list) + [task]
             # TODO: Increment task space size
             self.gym_space = self.increase_space()
             # TODO: Optimize adding tasks
-            self._encoder, self._decoder = self._make_task_encoder(self.gym_space, self._task_set)
+            self._encoder, self._decoder = self._make_task_encoder(self.gym_space, self._task_list)
+            self._update_task_cache()
 
     def _sum_axes(list_or_size: Union[list, int]):
         if isinstance(list_or_size, int) or isinstance(list_or_size, np.int64):
@@ -155,10 +214,7 @@ class TaskSpace():
 
     @property
     def tasks(self) -> List[Any]:
-        # TODO: Can I just use _tasks?
-        if isinstance(self.gym_space, MultiDiscrete):
-            return list(range(len(self._task_list)))
-        return self._task_list
+        return self._tasks
 
     def get_tasks(self, gym_space: Space = None, sample_interval: float = None) -> List[tuple]:
         """
@@ -173,14 +229,17 @@ class TaskSpace():
             return list(range(gym_space.n))
         elif isinstance(gym_space, Box):
             raise NotImplementedError
-        elif isinstance(gym_space, Tuple):
-            return list(itertools.product([self.get_tasks(task_space=s) for s in gym_space.spaces]))
-        elif isinstance(gym_space, Dict):
-            return itertools.product([self.get_tasks(task_space=s) for s in gym_space.spaces.values()])
+        elif isinstance(gym_space, (Tuple, Dict)):
+            # Composite tasks are the cartesian product of their subspace tasks
+            subspaces = gym_space.spaces if isinstance(gym_space, Tuple) else gym_space.spaces.values()
+            return list(itertools.product(*[self.get_tasks(gym_space=s) for s in subspaces]))
         elif isinstance(gym_space, MultiBinary):
-            return list(self._enumerate_axes(gym_space.nvec))
+            return list(itertools.product(range(2), repeat=int(np.prod(gym_space.n))))
         elif isinstance(gym_space, MultiDiscrete):
-            return list(self._enumerate_axes(gym_space.nvec))
+            if gym_space.nvec.ndim > 1:
+                return list(self._enumerate_axes(gym_space.nvec))
+            # Tasks must stay hashable tuples, and itertools.product builds them faster than converting array rows
+            return list(itertools.product(*[range(n) for n in gym_space.nvec.tolist()]))
         elif gym_space is None:
             return []
         else:
@@ -188,8 +247,7 @@ class TaskSpace():
 
     @property
     def num_tasks(self) -> int:
-        # TODO: Cache results
-        return self.count_tasks()
+        return self._num_tasks
 
     def count_tasks(self, gym_space: Space = None) -> int:
         """
@@ -197,31 +255,45 @@ class TaskSpace():
         Returns None for continuous spaces.
         Graph space not implemented.
         """
-        # TODO: Test these implementations
         if gym_space is None:
-            gym_space = self.gym_space
+            return self._num_tasks
+        return self._count_tasks(gym_space)
+
+    def _count_tasks(self, gym_space: Space) -> int:
+        # Counts are memoized per subspace and cleared by _update_task_cache
+        cached = self._space_task_counts.get(id(gym_space))
+        if cached is not None and cached[0] is gym_space:
+            return cached[1]
 
         if isinstance(gym_space, Discrete):
-            return gym_space.n
+            count = gym_space.n
         elif isinstance(gym_space, Box):
-            return None
-        elif isinstance(gym_space, Tuple):
-            return sum([self.count_tasks(gym_space=s) for s in gym_space.spaces])
-        elif isinstance(gym_space, Dict):
-            return sum([self.count_tasks(gym_space=s) for s in gym_space.spaces.values()])
+            count = None
+        elif isinstance(gym_space, (Tuple, Dict)):
+            # Composite tasks are the cartesian product of their subspace tasks
+            subspaces = gym_space.spaces if isinstance(gym_space, Tuple) else gym_space.spaces.values()
+            child_counts = [self._count_tasks(s) for s in subspaces]
+            # Multiply as Python ints, since large composite spaces overflow int64
+            count = None if None in child_counts else functools.reduce(operator.mul, (int(c) for c in child_counts), 1)
         elif isinstance(gym_space, MultiBinary):
-            return TaskSpace._sum_axes(gym_space.nvec)
+            count = 2 ** int(np.prod(gym_space.n))
         elif isinstance(gym_space, MultiDiscrete):
-            return TaskSpace._sum_axes(gym_space.nvec)
+            count = TaskSpace._sum_axes(gym_space.nvec)
         elif gym_space is None:
-            return 0
+            count = 0
         else:
             raise NotImplementedError(f"Unsupported task space type: {type(gym_space)}")
 
+        self._space_task_counts[id(gym_space)] = (gym_space, count)
+        return count
+
     def task_name(self, task):
         return repr(self.decode(task))
 
     def contains(self, task):
+        if self._is_discrete:
+            # Every in-range Discrete encoding decodes to a known task, so only names need a set lookup
+            return self._contains(task) or task in self._task_set
         return task in self._task_set or self.decode(task) in self._task_set
 
     def increase_space(self, amount: Union[int, float] = 1):
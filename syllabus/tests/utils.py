@@ -176,15 +176,18 @@ def run_episodes(env_fn, env_args, env_kwargs, curriculum=None, num_episodes=10,
     env = env_fn(env_args=env_args, env_kwargs=env_kwargs)
     ep_rews = []
     for _ in range(num_episodes):
-        if curriculum:
-            task = env.task_space.decode(curriculum.sample()[0])
-            rews = run_episode(env, new_task=task, curriculum=curriculum, env_id=env_id)
-        else:
-            rews = run_episode(env)
-        ep_rews.append(rews)
+        ep_rews.append(run_curriculum_episode(env, curriculum=curriculum, env_id=env_id))
     env.close()
 
 
+def run_curriculum_episode(env, curriculum=None, env_id=0):
+    """Run a single episode on a task sampled from the curriculum, if one is provided."""
+    if curriculum:
+        task = env.task_space.decode(curriculum.sample()[0])
+        return run_episode(env, new_task=task, curriculum=curriculum, env_id=env_id)
+    return run_episode(env)
+
+
 def run_episodes_queue(env_fn, env_args, env_kwargs, curriculum_components, sync=True, num_episodes=10, update_on_step=True, buffer_size=2, env_id=0):
     env = env_fn(curriculum_components, env_args=env_args, env_kwargs=env_kwargs, type="queue", update_on_step=update_on_step, buffer_size=buffer_size, batch_size=1) if sync else env_fn(env_args=env_args, env_kwargs=env_kwargs)
     ep_rews = []
@@ -204,10 +207,14 @@ def run_episodes_ray(env_fn, env_args, env_kwargs, sync=True, num_episodes=10, u
 
 def run_single_process(env_fn, env_args=(), env_kwargs={}, curriculum=None, num_envs=2, num_episodes=10):
     start = time.time()
+    # Create each environment once and reuse it for all of its episodes
+    envs = [env_fn(env_args=env_args, env_kwargs=env_kwargs) for _ in range(num_envs)]
     for num_eps in range(num_episodes):
         # Interleave episodes for each environment
-        for env_idx in range(num_envs):
-            run_episodes(env_fn, env_args, env_kwargs, curriculum=curriculum, num_episodes=1, env_id=env_idx)
+        for env_idx, env in enumerate(envs):
+            run_curriculum_episode(env, curriculum=curriculum, env_id=env_idx)
+    for env in envs:
+        env.close()
     end = time.time()
     native_speed = end - start
     return native_speed
@@ -237,7 +244,7 @@ def run_native_multiprocess(env_fn, env_args=(), env_kwargs={}, curriculum=None,
 
     # Stop curriculum to prevent it from slowing down the next test
     if curriculum:
-        curriculum.stop()
+        curriculum.close()
     return native_speed
 
 
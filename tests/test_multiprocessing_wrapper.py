@@ -0,0 +1,61 @@
+import gymnasium as gym
+import pytest
+from torch.multiprocessing import Process, SimpleQueue
+
+from syllabus.core import MultiProcessingCurriculumWrapper, make_multiprocessing_curriculum
+from syllabus.curricula import DomainRandomization
+from syllabus.task_space import TaskSpace
+
+NUM_TASKS = 4
+REQUEST = {"update_type": "noop", "metrics": None, "request_sample": True}
+
+
+def _request_tasks(components, num_requests):
+    for _ in range(num_requests):
+        components.put_update([REQUEST])
+        task = components.get_task()["next_task"]
+        assert 0 <= task < NUM_TASKS
+
+
+def _raise_update(metrics):
+    raise RuntimeError("update failed")
+
+
+def test_workers_receive_tasks_and_close_stops_threads():
+    curriculum = make_multiprocessing_curriculum(DomainRandomization(TaskSpace(gym.spaces.Discrete(NUM_TASKS))))
+    workers = [Process(target=_request_tasks, args=(curriculum.get_components(), 20)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    curriculum.close()
+    assert not curriculum.update_thread.is_alive()
+    assert not curriculum.sample_thread.is_alive()
+    assert curriculum.num_assigned_tasks == 60
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_stop_after_failed_update():
+    base_curriculum = DomainRandomization(TaskSpace(gym.spaces.Discrete(NUM_TASKS)))
+    base_curriculum.update_batch = _raise_update
+    curriculum = make_multiprocessing_curriculum(base_curriculum)
+    curriculum.get_components().put_update([REQUEST])
+    curriculum.update_thread.join(timeout=10)
+    assert not curriculum.update_thread.is_alive()
+
+    curriculum.stop(timeout=10)
+    assert not curriculum.sample_thread.is_alive()
+
+
+def test_close_without_start_releases_shared_memory():
+    curriculum = MultiProcessingCurriculumWrapper(
+        DomainRandomization(TaskSpace(gym.spaces.Discrete(3))), SimpleQueue(), SimpleQueue()
+    )
+    components = curriculum.get_components()
+    curriculum.close()
+    with pytest.raises(FileNotFoundError):
+        components._task_count.shm.unlink()
+    # Closing again is a no-op
+    curriculum.close()
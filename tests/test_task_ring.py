@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+from torch.multiprocessing import Process, SimpleQueue
+
+from syllabus.core import MultiProcessingComponents
+from syllabus.core.curriculum_sync_wrapper import TaskRing
+
+
+def _pop_into(ring, results, count):
+    for _ in range(count):
+        results.put(ring.pop())
+
+
+@pytest.fixture
+def components():
+    components = MultiProcessingComponents(SimpleQueue(), SimpleQueue(), task_ring_size=4)
+    yield components
+    components.close()
+
+
+def test_wrap_around():
+    ring = TaskRing(capacity=4)
+    popped = []
+    for start in range(0, 20, 3):
+        ring.push_many(list(range(start, start + 3)))
+        popped.extend(ring.pop() for _ in range(3))
+    assert popped == list(range(21))
+    assert len(ring) == 0
+
+
+def test_push_blocks_while_full():
+    ring = TaskRing(capacity=2)
+    ring.push_many([0, 1])
+    pusher = threading.Thread(target=ring.push, args=(2,), daemon=True)
+    pusher.start()
+    pusher.join(timeout=0.2)
+    assert pusher.is_alive()
+
+    assert ring.pop() == 0
+    pusher.join(timeout=5)
+    assert not pusher.is_alive()
+    assert [ring.pop(), ring.pop()] == [1, 2]
+
+
+def test_multiple_consumers():
+    ring = TaskRing(capacity=8)
+    results = SimpleQueue()
+    num_consumers, per_consumer = 4, 50
+    consumers = [Process(target=_pop_into, args=(ring, results, per_consumer)) for _ in range(num_consumers)]
+    for consumer in consumers:
+        consumer.start()
+
+    ring.push_many(list(range(num_consumers * per_consumer)))
+    popped = [results.get() for _ in range(num_consumers * per_consumer)]
+    for consumer in consumers:
+        consumer.join(timeout=10)
+        assert consumer.exitcode == 0
+    assert sorted(popped) == list(range(num_consumers * per_consumer))
+
+
+def test_mixed_messages_keep_order(components):
+    received = []
+    # Bursts of 3 tasks wrap around the 4 slot ring
+    components.put_task_encodings([0, "a", 1])
+    received.extend(components.get_task() for _ in range(3))
+    components.put_tasks([{"next_task": 2, "extra": True}])
+    components.put_task_encodings([-1, 3])
+    received.extend(components.get_task() for _ in range(3))
+
+    assert received == [
+        {"next_task": 0},
+        {"next_task": "a"},
+        {"next_task": 1},
+        {"next_task": 2, "extra": True},
+        {"next_task": -1},
+        {"next_task": 3},
+    ]
@@ -0,0 +1,65 @@
+import gymnasium as gym
+import numpy as np
+
+from syllabus.task_space import TaskSpace
+
+
+def test_decode_many_matches_decode():
+    task_space = TaskSpace(gym.spaces.Discrete(3), ["a", "b", "c"])
+    for encodings in ([0, 2, 1], [True, False], [5, -1, 0]):
+        assert task_space.decode_many(encodings) == [task_space.decode(encoding) for encoding in encodings]
+
+
+def test_count_tasks():
+    task_space = TaskSpace(gym.spaces.Tuple((gym.spaces.Discrete(2), gym.spaces.Discrete(3))))
+    assert task_space.count_tasks() == 6
+    assert task_space.num_tasks == len(task_space.get_tasks())
+
+
+def test_count_tasks_large_product():
+    task_space = TaskSpace(gym.spaces.Tuple([gym.spaces.Discrete(1000)] * 7))
+    assert task_space.count_tasks() == 10 ** 21
+    assert task_space.num_tasks == 10 ** 21
+
+
+def test_get_tasks_composite():
+    expected = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+    task_space = TaskSpace(gym.spaces.Tuple((gym.spaces.Discrete(2), gym.spaces.Discrete(3))))
+    assert task_space.get_tasks() == expected
+    task_space = TaskSpace(gym.spaces.Dict({"a": gym.spaces.Discrete(2), "b": gym.spaces.Discrete(3)}))
+    assert task_space.get_tasks() == expected
+    assert task_space.count_tasks() == len(expected)
+
+
+def test_count_tasks_after_add_task():
+    task_space = TaskSpace(gym.spaces.Discrete(3), ["a", "b", "c"])
+    assert task_space.count_tasks() == 3
+    task_space.add_task("d")
+    assert task_space.count_tasks() == 4
+    assert task_space.num_tasks == len(task_space.get_tasks())
+
+
+def test_multibinary_tasks():
+    task_space = TaskSpace(gym.spaces.Discrete(3))
+    multibinary = gym.spaces.MultiBinary(3)
+    assert task_space.get_tasks(gym_space=multibinary) == [
+        (0, 0, 0), (0, 0, 1), (0, 1, 0), (0, 1, 1), (1, 0, 0), (1, 0, 1), (1, 1, 0), (1, 1, 1)
+    ]
+    assert task_space.count_tasks(gym_space=multibinary) == 8
+    assert task_space.count_tasks(gym_space=gym.spaces.MultiBinary([2, 2])) == 16
+
+
+def test_decode_integral_floats():
+    task_space = TaskSpace(gym.spaces.Discrete(3), ["a", "b", "c"])
+    assert task_space.decode(1.0) == "b"
+    assert task_space.decode(np.float32(2.0)) == "c"
+    assert task_space.decode(1.5) is None
+    assert task_space.decode(3.0) is None
+    assert task_space.decode_many([0.0, 1.5]) == ["a", None]
+    assert task_space.contains(1.0)
+
+
+def test_contains_returns_bool():
+    task_space = TaskSpace(gym.spaces.Discrete(3), ["a", "b", "c"])
+    assert task_space.contains(0) is True
+    assert task_space.contains(3) is False